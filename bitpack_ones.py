@@ -16,80 +16,133 @@ Usage:
 Notes:
 - Every input byte is mapped; non-'1' characters (including newlines) become 0 bits.
 - Final byte is padded with 0s if the total count of input bytes is not a multiple of 8.
-- Uses only the Python standard library.
+- Requires NumPy; the compare and pack run in NumPy's vectorized C loops.
 """
 
 from __future__ import annotations
 
 import argparse
+import contextlib
 import os
+import queue
 import sys
-from typing import BinaryIO
+import threading
+from typing import BinaryIO, Callable, Iterator, Optional
+
+import numpy as np
 
 ASCII_ONE = 0x31  # ord('1')
-DEFAULT_CHUNK_SIZE = 1024 * 1024  # 1 MiB chunks
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024  # 8 MiB chunks -> 1 MiB packed write per chunk
+WRITE_BUFFER_SIZE = 1024 * 1024  # Flush packed output once this many bytes accumulate
+READ_AHEAD = 4  # Chunks the reader thread may buffer ahead of the packer
 
 
-def pack_chunk_to_bits(chunk: bytes) -> bytes:
-    """Pack a bytes chunk into bit-packed bytes (MSB-first per output byte).
+def pack_chunk_to_bits(chunk) -> bytes:
+    """Pack a bytes-like chunk into bit-packed bytes (MSB-first per output byte).
 
     Each input byte -> 1 bit in output: set if byte == ASCII '1'.
+    If len(chunk) is not a multiple of 8, the last output byte is padded with 0s.
     """
-    out = bytearray()
-    bit_acc = 0
-    bit_count = 0
-
-    for b in chunk:
-        bit = 1 if b == ASCII_ONE else 0
-        bit_acc = (bit_acc << 1) | bit  # MSB-first within the byte
-        bit_count += 1
-        if bit_count == 8:
-            out.append(bit_acc)
-            bit_acc = 0
-            bit_count = 0
+    mask = np.frombuffer(chunk, dtype=np.uint8) == ASCII_ONE
+    return np.packbits(mask, bitorder="big").tobytes()
 
-    # If there are leftover bits, pad the remaining lower bits with 0s
-    if bit_count:
-        bit_acc = bit_acc << (8 - bit_count)
-        out.append(bit_acc)
 
-    return bytes(out)
+def read_chunks(fp: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+    """Yield successive chunks of fp, read ahead by a background thread.
 
-
-def stream_pack(input_fp: BinaryIO, output_fp: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> tuple[int, int]:
+    The next reads overlap with whatever the caller does with the current chunk.
+    NumPy releases the GIL inside its C loops, so the two really run in parallel.
+    Exceptions raised while reading are re-raised in the caller. If the caller
+    stops early, closing the generator stops the reader thread, after at most
+    one more read.
+    """
+    q: queue.Queue = queue.Queue(maxsize=READ_AHEAD)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # Hand item to the consumer; give up (returning False) once it has gone away
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def reader() -> None:
+        try:
+            while True:
+                chunk = fp.read(chunk_size)
+                if not put(chunk) or not chunk:
+                    return
+        except BaseException as e:
+            put(e)
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if isinstance(item, BaseException):
+                raise item
+            if not item:
+                break
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def stream_pack(
+    input_fp: BinaryIO,
+    output_fp: BinaryIO,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_packed: Optional[Callable[[bytes], None]] = None,
+) -> tuple[int, int]:
     """Stream the input, writing packed bits to output.
 
+    Input is read on a background thread so disk reads overlap with packing.
+    If given, on_packed is called with each packed chunk, in output order, before
+    it is written; together the chunks are exactly the output bytes.
+
     Returns a tuple: (input_bytes_processed, output_bytes_written)
     """
     total_in = 0
     total_out = 0
 
-    # For correctness across chunk boundaries, we should carry bit state.
-    # Instead of packing each chunk independently (which would pad in the middle),
-    # we implement a streaming packer with carry-over.
-    bit_acc = 0
-    bit_count = 0
-
-    while True:
-        chunk = input_fp.read(chunk_size)
-        if not chunk:
-            break
-        total_in += len(chunk)
-
-        for b in chunk:
-            bit = 1 if b == ASCII_ONE else 0
-            bit_acc = (bit_acc << 1) | bit
-            bit_count += 1
-            if bit_count == 8:
-                output_fp.write(bytes((bit_acc,)))
-                total_out += 1
-                bit_acc = 0
-                bit_count = 0
-
-    if bit_count:
-        bit_acc = bit_acc << (8 - bit_count)
-        output_fp.write(bytes((bit_acc,)))
-        total_out += 1
+    # For correctness across chunk boundaries we only pack whole groups of 8 input
+    # bytes per chunk and carry the tail over into the next chunk, so padding only
+    # ever happens at the very end.
+    carry = b""
+    # Packed output is batched so small --chunk-size values don't turn into many tiny writes
+    out = bytearray()
+
+    # Close the reader explicitly so its thread stops even if a write below raises
+    with contextlib.closing(read_chunks(input_fp, chunk_size)) as chunks:
+        for chunk in chunks:
+            total_in += len(chunk)
+
+            buf = carry + chunk if carry else chunk
+            whole = len(buf) & ~7
+            carry = buf[whole:]
+            if whole:
+                packed = pack_chunk_to_bits(memoryview(buf)[:whole])
+                if on_packed is not None:
+                    on_packed(packed)
+                out += packed
+                if len(out) >= WRITE_BUFFER_SIZE:
+                    output_fp.write(out)
+                    total_out += len(out)
+                    out.clear()
+
+    if carry:
+        packed = pack_chunk_to_bits(carry)
+        if on_packed is not None:
+            on_packed(packed)
+        out += packed
+    if out:
+        output_fp.write(out)
+        total_out += len(out)
 
     return total_in, total_out
 
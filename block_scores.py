@@ -22,25 +22,53 @@ Notes:
   the requested number of full blocks, processing stops early and a warning is
   printed to stderr.
 - Final partial block (if any) is ignored to avoid padding effects.
-- Uses only the Python standard library.
+- Requires NumPy for the vectorized popcount.
 """
 
 from __future__ import annotations
 
 import argparse
+import mmap
 import os
+import stat
 import sys
 from typing import BinaryIO
 
+import numpy as np
+
+from density_ones import popcount_int
+
 # Fixed block size: 40,000 bits = 5,000 bytes (evenly divisible by 8)
 BLOCK_BITS = 40000
 BLOCK_BYTES = BLOCK_BITS // 8  # 5000
 
-# Precompute popcount for 0..255.
-# POPCOUNT[x] gives the number of set bits (1s) in the 8-bit value x.
-# Implemented as a small lookup table stored in a bytes object for compactness.
-# We'll access it through a memoryview for fast indexed reads during streaming.
-POPCOUNT = bytes([bin(i).count("1") for i in range(256)])
+# Number of blocks popcounted per vectorized NumPy call (~5 MB of input)
+BATCH_BLOCKS = 1024
+
+
+def block_popcounts(buf) -> np.ndarray:
+    """Return the number of set bits in each BLOCK_BYTES block of a bytes-like buffer.
+
+    len(buf) must be a whole number of blocks. The buffer is viewed (zero-copy) as
+    rows of uint64 words, so each block is counted with one POPCNT per 8 bytes.
+    """
+    if hasattr(np, "bitwise_count"):
+        words = np.frombuffer(buf, dtype=np.uint64).reshape(-1, BLOCK_BYTES // 8)
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int64)
+    mv = memoryview(buf)
+    return np.array(
+        [popcount_int(int.from_bytes(mv[i:i + BLOCK_BYTES], "little")) for i in range(0, len(mv), BLOCK_BYTES)],
+        dtype=np.int64,
+    )
+
+
+def score_for_ones(ones: int) -> int:
+    """Return the score of a block containing `ones` set bits.
+
+    score = (ones * 2) + (zeros * 4) with zeros = BLOCK_BITS - ones, which is just
+    4 * BLOCK_BITS - 2 * ones. So the max score is the block with the fewest ones.
+    """
+    return (4 * BLOCK_BITS) - (2 * ones)
 
 
 def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
@@ -53,26 +81,51 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
 def stream_block_scores(fp: BinaryIO, blocks: int) -> int:
     """Read fixed-size blocks, track the maximum score, and print it once at the end.
 
-    For regular files, read(BLOCK_BYTES) will return a full block unless EOF.
-    We stop when a partial read occurs (insufficient data for a full block).
+    A regular file is memory-mapped and popcounted BATCH_BLOCKS blocks at a time from
+    zero-copy memoryview slices, so there is no per-block read() call, bytes
+    allocation, or Python-level arithmetic. Other inputs (pipes, /dev/stdin) cannot
+    be mapped or sized up front, so they are read BATCH_BLOCKS blocks at a time
+    instead. Any trailing partial block (insufficient data for a full block) is ignored.
     """
-    mv = memoryview(POPCOUNT)
-
     blocks_done = 0
-    max_score = None
-
-    while blocks_done < blocks:
-        block = fp.read(BLOCK_BYTES)
-        if len(block) < BLOCK_BYTES:
-            break
-        # Count ones in this block via popcount table
-        ones = sum(mv[b] for b in block)
-        zeros = BLOCK_BITS - ones
-        score = (ones * 2) + (zeros * 4)
-
-        if (max_score is None) or (score > max_score):
-            max_score = score
-        blocks_done += 1
+    min_ones = None
+
+    def scan(buf) -> None:
+        # buf holds a whole number of blocks
+        nonlocal blocks_done, min_ones
+        ones = int(block_popcounts(buf).min())
+        if (min_ones is None) or (ones < min_ones):
+            min_ones = ones
+        blocks_done += len(buf) // BLOCK_BYTES
+
+    st = os.fstat(fp.fileno())
+    if stat.S_ISREG(st.st_mode):
+        nblocks = min(blocks, st.st_size // BLOCK_BYTES)
+        if nblocks:
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mmap, "MADV_SEQUENTIAL"):
+                    # Ask the kernel for aggressive readahead (not available on Windows)
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                with memoryview(mm) as mv:
+                    for start in range(0, nblocks, BATCH_BLOCKS):
+                        stop = min(start + BATCH_BLOCKS, nblocks)
+                        scan(mv[start * BLOCK_BYTES:stop * BLOCK_BYTES])
+    else:
+        # Reads from a pipe may come back short, so collect bytes until whole blocks are in hand
+        pending = bytearray()
+        while blocks_done < blocks:
+            data = fp.read(BATCH_BLOCKS * BLOCK_BYTES)
+            if not data:
+                break
+            pending += data
+            whole = min(len(pending) // BLOCK_BYTES, blocks - blocks_done) * BLOCK_BYTES
+            if whole:
+                with memoryview(pending) as mv:
+                    scan(mv[:whole])
+                del pending[:whole]
+
+    # The max score comes from the block with the fewest ones (see score_for_ones)
+    max_score = None if min_ones is None else score_for_ones(min_ones)
 
     if max_score is not None:
         # Print only the maximum score found across processed blocks
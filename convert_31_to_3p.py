@@ -1,7 +1,10 @@
 import argparse
 from pathlib import Path
+import shutil
 import sys
 
+COPY_BUFFER_SIZE = 8 * 1024 * 1024  # 8 MiB
+
 
 def convert_file(input_path: Path, output_path: Path) -> None:
     """
@@ -18,11 +21,7 @@ def convert_file(input_path: Path, output_path: Path) -> None:
         with output_path.open("wb") as fout:
             fout.write(b"3P")  # replacement
             # Copy the remainder of the file in chunks
-            while True:
-                chunk = fin.read(1024 * 1024)
-                if not chunk:
-                    break
-                fout.write(chunk)
+            shutil.copyfileobj(fin, fout, COPY_BUFFER_SIZE)
 
 
 def main(argv=None) -> int:
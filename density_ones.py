@@ -22,36 +22,59 @@ Notes:
 - When --original-input or --valid-bits is provided, density is computed as
   ones_count / valid_bits. Since padding bits are zeros, no adjustment to the
   ones count is required.
-- Uses only the Python standard library.
+- Requires NumPy for the vectorized popcount.
 """
 
 from __future__ import annotations
 
 import argparse
+import contextlib
 import os
 import sys
 from typing import BinaryIO, Tuple
 
+import numpy as np
+
+from bitpack_ones import read_chunks
+
 DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024  # 4 MiB
 
-# Precompute popcount for 0..255
-POPCOUNT = bytes([bin(i).count("1") for i in range(256)])
+# Popcount of an arbitrarily large int. Used as the fallback on NumPy < 2.0, which
+# lacks np.bitwise_count: CPython's int.bit_count (3.10+) runs as one C loop over
+# the whole big-int, far faster than a per-byte table lookup in Python.
+if hasattr(int, "bit_count"):
+    popcount_int = int.bit_count
+else:
+    def popcount_int(n: int) -> int:
+        return bin(n).count("1")
+
+
+def count_ones(buf) -> int:
+    """Return the number of set bits in a bytes-like buffer."""
+    if hasattr(np, "bitwise_count"):
+        arr = np.frombuffer(buf, dtype=np.uint8)
+        # Count 64 bits per element (one hardware POPCNT each) and only handle the
+        # odd tail bytewise. ~4x faster than bitwise_count over uint8.
+        whole = arr.size & ~7
+        ones = int(np.bitwise_count(arr[:whole].view(np.uint64)).sum(dtype=np.int64))
+        if whole != arr.size:
+            ones += int(np.bitwise_count(arr[whole:]).sum(dtype=np.int64))
+        return ones
+    return popcount_int(int.from_bytes(buf, "little"))
 
 
 def count_ones_stream(fp: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[int, int]:
-    """Return (total_bytes_read, ones_count) by streaming through the file."""
+    """Return (total_bytes_read, ones_count) by streaming through the file.
+
+    Input is read on a background thread so disk reads overlap with counting.
+    """
     total_bytes = 0
     ones = 0
-    mv = memoryview(POPCOUNT)
-
-    while True:
-        chunk = fp.read(chunk_size)
-        if not chunk:
-            break
-        total_bytes += len(chunk)
-        # Sum popcounts
-        # Convert each byte to an index into POPCOUNT; using sum over mv[b]
-        ones += sum(mv[b] for b in chunk)
+
+    with contextlib.closing(read_chunks(fp, chunk_size)) as chunks:
+        for chunk in chunks:
+            total_bytes += len(chunk)
+            ones += count_ones(chunk)
 
     return total_bytes, ones
 
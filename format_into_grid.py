@@ -27,6 +27,10 @@ assert TOTAL_DIGITS == 1_000_000_000, f"Grid must contain exactly 1 billion digi
 BLOCK_H_PADDING = "  "
 BLOCK_V_PADDING = "\n"
 
+# Output is written as raw bytes straight to sys.stdout.buffer, one write per row
+BLOCK_H_PADDING_BYTES = BLOCK_H_PADDING.encode("ascii")
+BLOCK_V_PADDING_BYTES = BLOCK_V_PADDING.encode("ascii")
+
 # here is the bitmap 3x5 (4x6 including padding) for the digits 0-9
 # Do note that we turn the ".1" in the inital "3.1" into a single
 # char that is 4 pixels wide, otherwise we would only have 999,999,999 digits and that would suck.
@@ -42,8 +46,10 @@ def process_file(filename, max_rows=None):
         filename (str): Path to the text file to read
         max_rows (int, optional): Maximum number of rows to process. If None, process all rows.
     """
+    out = sys.stdout.buffer
+
     try:
-        with open(filename, 'r', encoding='utf-8') as file:
+        with open(filename, 'rb') as file:
 
             row_number = 0
 
@@ -51,20 +57,21 @@ def process_file(filename, max_rows=None):
 
                 for row_in_block in range(BLOCK_SIZE_Y):
 
+                    # Build the whole padded row, then hand it to stdout in a single write
+                    row_parts = []
                     for block_x in range(BLOCK_COUNT_X):
 
-                        block_row = file.read(BLOCK_SIZE_X)
+                        row_parts.append(file.read(BLOCK_SIZE_X))
+                        row_parts.append(BLOCK_H_PADDING_BYTES)
 
-                        print(block_row, end='')
-                        print(BLOCK_H_PADDING, end='')
-
-                    print("") # every row always ends with a newline.
+                    row_parts.append(b"\n") # every row always ends with a newline.
+                    out.write(b"".join(row_parts))
                     row_number += 1
 
                     if max_rows and row_number >= max_rows:
                         return
                 
-                print(BLOCK_V_PADDING, end='')
+                out.write(BLOCK_V_PADDING_BYTES)
 
 
     except FileNotFoundError:
@@ -73,9 +80,6 @@ def process_file(filename, max_rows=None):
     except IOError as e:
         print(f"Error reading file '{filename}': {e}")
         return False
-    except UnicodeDecodeError as e:
-        print(f"Error decoding file '{filename}': {e}")
-        return False
     
     return True
 
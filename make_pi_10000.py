@@ -3,7 +3,7 @@
 Extract the first 10,000 digits from pi-billion.txt and write them
 as 100 lines of 100 digits to pi-10000.txt.
 
-Streaming, stops as soon as 10,000 digits are collected.
+Only reads the leading bytes it needs, never the whole file.
 """
 from __future__ import annotations
 
@@ -16,38 +16,35 @@ def main():
     target = 10000
     per_line = 100
 
-    digits = []
-    got = 0
-
-    with open(src, "r", encoding="utf-8", newline="") as f:
-
-
-        for line in f:
-            for ch in line:
-                digits.append(ch)
-                got += 1
-                if got >= target:
-                    break
-            if got >= target:
+    # Read the leading digits as raw bytes, dropping any line breaks / spaces, and
+    # keep reading until we have `target` digits or hit EOF
+    digits = bytearray()
+    with open(src, "rb") as f:
+        while len(digits) < target:
+            chunk = f.read(2 * target)
+            if not chunk:
                 break
+            digits += chunk.translate(None, b"\r\n ")
+    digits = bytes(digits[:target])
+    got = len(digits)
 
     if got < target:
         raise SystemExit(f"Only found {got} digits in {src}, need {target}.")
 
-    with open(dst, "w", encoding="utf-8", newline="\n") as out:
+    with open(dst, "wb") as out:
         row_index = 0
         for i in range(0, target, per_line):
             # Build one row of 100 digits with a 3-space gap after every 10 digits
             row_parts = []
             for j in range(0, per_line, 10):
-                row_parts.append("".join(digits[i + j:i + j + 10]))
-                row_parts.append("   ")  # 3-space gap after each block of 10
-            out.write("".join(row_parts))
-            out.write("\n")
+                row_parts.append(digits[i + j:i + j + 10])
+                row_parts.append(b"   ")  # 3-space gap after each block of 10
+            out.write(b"".join(row_parts))
+            out.write(b"\n")
             row_index += 1
             # After every 10 rows, add a vertical blank line
             if row_index % 10 == 0:
-                out.write("\n")
+                out.write(b"\n")
 
     print(f"Wrote {dst} with {target} digits as {target//per_line} lines of {per_line}.")
 
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+pi_pipeline.py
+
+Single-pass version of bitpack_ones.py -> density_ones.py -> block_scores.py.
+
+Reads an input text file (e.g., pi digits) once and packs it into the same
+'1'-bitmask that bitpack_ones.py writes, while also counting the total number of
+1s and the 1s in each fixed 40,000-bit block. Only the packed output is written
+to disk; the density and the maximum block score are printed to stdout. This
+saves re-reading the packed file for each report.
+
+Usage:
+  python pi_pipeline.py --input pi-billion.txt --output pi-billion.ones.bin
+
+Notes:
+- The packed output is byte-identical to bitpack_ones.py.
+- The density matches density_ones.py --original-input, and the max score matches
+  block_scores.py run over every full block in the packed file.
+- Requires NumPy.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from typing import BinaryIO, Optional, Tuple
+
+from bitpack_ones import DEFAULT_CHUNK_SIZE, stream_pack
+from block_scores import BLOCK_BYTES, block_popcounts, score_for_ones
+from density_ones import count_ones
+
+
+def stream_pipeline(
+    input_fp: BinaryIO, output_fp: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Tuple[int, int, int, int, Optional[int]]:
+    """Stream the input, writing packed bits to output and counting ones on the way.
+
+    Packing and writing are done by bitpack_ones.stream_pack, which hands each
+    packed chunk to consume() below as it is produced.
+
+    Returns a tuple:
+      (input_bytes_processed, output_bytes_written, ones, full_blocks, min_block_ones)
+    where min_block_ones is None if the output holds no full block.
+    """
+    ones = 0
+    blocks_done = 0
+    min_ones = None
+
+    # Packed bytes of the current, not yet complete, block
+    block_tail = bytearray()
+
+    def consume(packed: bytes) -> None:
+        nonlocal ones, blocks_done, min_ones
+        block_tail.extend(packed)
+        whole = len(block_tail) - (len(block_tail) % BLOCK_BYTES)
+        if whole:
+            with memoryview(block_tail) as mv:
+                counts = block_popcounts(mv[:whole])
+            # Every packed byte is counted once: here if it lands in a full block,
+            # otherwise from what is left in block_tail at the end
+            ones += int(counts.sum())
+            block_min = int(counts.min())
+            if (min_ones is None) or (block_min < min_ones):
+                min_ones = block_min
+            blocks_done += whole // BLOCK_BYTES
+            del block_tail[:whole]
+
+    total_in, total_out = stream_pack(input_fp, output_fp, chunk_size=chunk_size, on_packed=consume)
+    ones += count_ones(block_tail)
+
+    return total_in, total_out, ones, blocks_done, min_ones
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(
+        description="Pack ASCII '1' positions into a bitmask and report density and max block score in one pass"
+    )
+    p.add_argument("--input", "-i", required=True, help="Path to input text file (e.g., pi-billion.txt)")
+    p.add_argument(
+        "--output",
+        "-o",
+        required=False,
+        help="Path to output binary file (default: <input>.ones.bin)",
+    )
+    p.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"Read buffer size in bytes (default: {DEFAULT_CHUNK_SIZE})",
+    )
+    return p.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    in_path = args.input
+    out_path = args.output or f"{in_path}.ones.bin"
+
+    try:
+        with open(in_path, "rb") as fin, open(out_path, "wb") as fout:
+            total_in, total_out, ones, blocks, min_ones = stream_pipeline(fin, fout, chunk_size=args.chunk_size)
+    except FileNotFoundError:
+        print(f"Input file not found: {in_path}", file=sys.stderr)
+        return 1
+
+    density = (ones / total_in) if total_in else 0.0
+
+    print("Single-pass pack / density / block scores")
+    print(f"- Input: {in_path}")
+    print(f"- Output: {out_path}")
+    print(f"- Input bytes: {total_in}")
+    print(f"- Output bytes: {total_out}")
+    print(f"- Ones counted: {ones}")
+    print(f"- Density: {density:.12g}")
+    print(f"- Full blocks: {blocks}")
+    if min_ones is not None:
+        print(f"- Max block score: {score_for_ones(min_ones)}")
+    else:
+        print("No full blocks processed; cannot compute maximum score.", file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
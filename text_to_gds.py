@@ -11,15 +11,16 @@ Text-to-GDSII generator using a bitmap font.
 
 - Efficient generation:
   - All glyphs are prebuilt as separate GDS cells.
-  - The text file is streamed character-by-character using Python's internal buffering.
-  - We place references to glyph cells; no per-pixel polygons are duplicated.
+  - The text file is read line by line; each text row becomes its own cell of
+    references to the glyph cells, so no per-pixel polygons are duplicated.
+  - Row cells are streamed to disk through gdstk.GdsWriter as soon as they are
+    built, so memory stays bounded by a single row plus the top cell.
 
 Notes and caveats:
-- GDSII writers generally serialize the full library at write time; extremely huge
-  outputs (e.g., hundreds of millions to billions of characters) will yield enormous
-  files and memory usage. This script minimizes duplication via cell references but
-  the top-level still holds many references. Consider tiling/wrapping to practical
-  sizes via CLI options.
+- The top cell holds one by-name reference per non-blank text row, so it stays
+  small, but extremely huge inputs (e.g., hundreds of millions to billions of
+  characters) still yield enormous files. Use --rows-per-file to split the output
+  into several GDS files, and --jobs to write those parts in parallel.
 
 Requires: gdstk (pip install gdstk)
 """
@@ -27,6 +28,9 @@ Requires: gdstk (pip install gdstk)
 from __future__ import annotations
 
 import argparse
+import io
+import itertools
+import multiprocessing
 import os
 import re
 from typing import Dict, Tuple, Optional, Iterable
@@ -41,6 +45,18 @@ import gdstk
 
 # (Multiglyph composition removed; we now emit one cell per glyph.)
 
+# Font header line: WxH, e.g. "4x6"
+_FONT_HEADER_RE = re.compile(r"\s*(\d+)\s*[xX]\s*(\d+)\s*")
+
+# Backticked literal glyph key, e.g. `A`
+_GLYPH_KEY_RE = re.compile(r"`(.+)`")
+
+# Maps a bitmap row like "..X." to a binary literal like "0010" in a single pass
+_BITMAP_ROW_TO_BINARY = str.maketrans({".": "0", "X": "1"})
+
+# Any run of blank (whitespace-only) lines and '#' comment lines in a font file
+_FONT_SKIP_RE = re.compile(r"(?:[^\S\n]*\n|#[^\n]*\n)*")
+
 def _parse_glyph_key(line: str) -> str:
     """Parse a glyph identifier line.
 
@@ -52,7 +68,7 @@ def _parse_glyph_key(line: str) -> str:
         raise ValueError("Empty glyph key line")
 
     # Backticked literal `X`
-    m = re.fullmatch(r"`(.+)`", s)
+    m = _GLYPH_KEY_RE.fullmatch(s)
     if m:
         glyph = m.group(1)
         if len(glyph) != 1:
@@ -73,6 +89,9 @@ def _parse_glyph_key(line: str) -> str:
 
     raise ValueError(f"Unrecognized glyph key format: {s}")
 
+# Digits of the base-26 cell name sequence, indexed by value
+_CELL_NAME_LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
 def cell_name_from_index(index: int) -> str:
     """Return a monotonically assigned cell name for the given index.
 
@@ -92,7 +111,7 @@ def cell_name_from_index(index: int) -> str:
     n = index
     while n >= 0:
         n, rem = divmod(n, 26)
-        name_chars.append(chr(ord('A') + rem))
+        name_chars.append(_CELL_NAME_LETTERS[rem])
         n -= 1  #  base-26 adjustment
     return ''.join(reversed(name_chars))
 
@@ -116,7 +135,7 @@ def load_font_build_cells(
         if not header:
             raise ValueError("Font file is empty")
         header = header.strip()
-        m = re.fullmatch(r"\s*(\d+)\s*[xX]\s*(\d+)\s*", header)
+        m = _FONT_HEADER_RE.fullmatch(header)
         if not m:
             raise ValueError(
                 f"First line must be WxH like '4x6'; got: {header!r}"
@@ -141,46 +160,82 @@ def load_font_build_cells(
         )
         pixel_cell.add(pixel_rect)
 
-        line_iter = iter(f)
-        for line in line_iter:
-            line = line.rstrip("\n")
-            if not line.strip() or line.startswith("#"):
-                continue  # skip blank and comment lines
+        # Origin of every pixel position in a glyph, shared by all glyphs, indexed as
+        # [row][bit] where bit 0 is the rightmost pixel of the row (see row masks below).
+        # Bitmap rows are listed top-down but the glyph origin is at bottom-left.
+        pixel_origins = [
+            [((w_px - 1 - bit) * step_x, (h_px - 1 - y) * step_y) for bit in range(w_px)]
+            for y in range(h_px)
+        ]
+
+        # The font file is small, so read the rest of it in one go and let the regex
+        # engine find each glyph block rather than stepping through it line by line
+        text = f.read()
+        if not text.endswith("\n"):
+            text += "\n"
+        # A glyph key line followed by exactly h_px bitmap lines
+        glyph_block_re = re.compile(r"([^\n]*)\n((?:[^\n]*\n){%d})" % h_px)
+
+        pos = 0
+        while True:
+            pos = _FONT_SKIP_RE.match(text, pos).end()  # skip blank and comment lines
+            if pos >= len(text):
+                break
+
+            m = glyph_block_re.match(text, pos)
+            if m is None:
+                # Fewer than h_px lines left after this key
+                ch = _parse_glyph_key(text[pos:text.index("\n", pos)])
+                raise ValueError(
+                    f"Unexpected EOF while reading bitmap for glyph {ch!r}"
+                )
+            pos = m.end()
 
             # Parse glyph identifier line
-            ch = _parse_glyph_key(line)
-
-            # Read h_px bitmap rows
-            rows = []
-            for _ in range(h_px):
-                try:
-                    row = next(line_iter)
-                except StopIteration:
-                    raise ValueError(
-                        f"Unexpected EOF while reading bitmap for glyph {ch!r}"
-                    )
-                row = row.rstrip("\n").strip()
+            ch = _parse_glyph_key(m.group(1))
+
+            # Parse h_px bitmap rows, each packed into an int with the leftmost pixel as the MSB
+            row_masks = []
+            for row in m.group(2).splitlines():
+                row = row.strip()
                 if len(row) != w_px:
                     raise ValueError(
                         f"Row length {len(row)} != width {w_px} for glyph {ch!r}: {row!r}"
                     )
-                rows.append(row)
+                # Checked up front: int(..., 2) would also accept '0', '1', '_', '+' and '-'
+                if row.strip(".X"):
+                    raise ValueError(
+                        f"Bitmap row must contain only '.' and 'X' for glyph {ch!r}: {row!r}"
+                    )
+                row_masks.append(int(row.translate(_BITMAP_ROW_TO_BINARY), 2))
 
             # Build cell for this glyph using monotonic naming (A, B, ..., Z, AA, ...)
             safe_name = cell_name_from_index(next_cell_index)
             next_cell_index += 1
             cell = lib.new_cell(safe_name)
 
-            # Create references to the single pixel cell for ON pixels
+            # Create references to the single pixel cell for ON pixels. Each horizontal
+            # run of ON pixels becomes one reference: a plain SREF for a lone pixel, or a
+            # 1-row AREF for a run of 2+ (an AREF is one record, smaller than 2 SREFs).
+            # Runs are found from the row mask bits, starting at the lowest set bit.
             refs = []
-            for y in range(h_px):
-                row = rows[y]
-                for x in range(w_px):
-                    if row[x] == 'X':
-                        x0 = x * step_x
-                        y0 = (h_px - 1 - y) * step_y  # origin at bottom-left
-                        ref = gdstk.Reference(pixel_cell, origin=(x0, y0))
-                        refs.append(ref)
+            for y, mask in enumerate(row_masks):
+                origins = pixel_origins[y]
+                while mask:
+                    low_bit = (mask & -mask).bit_length() - 1
+                    shifted = mask >> low_bit
+                    run_len = ((shifted ^ (shifted + 1)) >> 1).bit_length()  # trailing ones
+                    # The leftmost pixel of the run is its highest bit
+                    origin = origins[low_bit + run_len - 1]
+                    if run_len == 1:
+                        refs.append(gdstk.Reference(pixel_cell, origin=origin))
+                    else:
+                        refs.append(
+                            gdstk.Reference(
+                                pixel_cell, origin=origin, columns=run_len, rows=1, spacing=(step_x, 0)
+                            )
+                        )
+                    mask &= ~(((1 << run_len) - 1) << low_bit)
 
             if refs:
                 cell.add(*refs)
@@ -297,6 +352,12 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="If set, split the output into multiple GDS files with at most this many rows per file to limit memory usage.",
     )
+    p.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="With --rows-per-file, write up to this many parts in parallel processes.",
+    )
     p.add_argument(
         "--progress-every",
         type=int,
@@ -312,7 +373,7 @@ def parse_args() -> argparse.Namespace:
 
 def _stream_rows_to_writer(
     fin,
-    lib: gdstk.Library,
+    writer: gdstk.GdsWriter,
     top: gdstk.Cell,
     glyph_cells: Dict[str, gdstk.Cell],
     advance_x: float,
@@ -321,13 +382,14 @@ def _stream_rows_to_writer(
     progress_every: int,
     starting_row: int = 0,
 ) -> Tuple[int, bool]:
-    """Stream text from an open file handle and add one cell per row to the library.
+    """Stream text lines from fin and write one cell per row to the given writer.
 
     Returns (rows_processed, eof_reached).
 
-    Each row is emitted as its own cell inside the given library; the given top cell
-    receives a reference to the row cell. The whole library (glyphs + rows + top) can
-    be written at the end of the part.
+    Each row is emitted as its own cell and written to disk immediately; the given
+    top cell only receives a by-name reference to it, so memory stays bounded by the
+    top cell's reference list instead of growing with every row's glyph references.
+    The caller writes the glyph cells before and the top cell after.
     """
     x = 0.0
     y = -starting_row * advance_y
@@ -335,21 +397,50 @@ def _stream_rows_to_writer(
     cell_count = 0
     digit_count = 0
 
+    # x position of each column, computed once and shared by every row (grown on demand)
+    x_offsets: list = []
+    # Every character a row may contain: the glyphs plus the (empty) space
+    known_chars = set(glyph_cells) | {" "}
+
     # Local helper: build a cell from a glyph string placed at a given y
     def row_to_cell(glyph_str: str, y_pos: float, name: str) -> gdstk.Cell:
-        row_cell = lib.new_cell(name)
-
-        xx = 0.0
-        for ch in glyph_str:
-            if ch == " ":
-                xx += advance_x
+        # Check the whole row against the font up front with one C-level set
+        # difference, so the placement loop below needs no per-character check
+        missing = set(glyph_str) - known_chars
+        if missing:
+            ch = next(c for c in glyph_str if c in missing)
+            raise ValueError(f"Missing glyph in font for character: {ch!r}")
+
+        row_cell = gdstk.Cell(name)
+
+        if len(glyph_str) > len(x_offsets):
+            x_offsets.extend(i * advance_x for i in range(len(x_offsets), len(glyph_str)))
+
+        # Gather each glyph's column positions in one pass, then emit a single
+        # Reference per distinct glyph with an explicit x-offset Repetition for the
+        # other copies. gdstk writes the repetition out as ordinary SREFs, so the
+        # geometry is unchanged; SREF order within a row differs (grouped by glyph
+        # rather than left to right). Only ~10 Python objects are built per row
+        # instead of one per digit. Glyphs are visited in sorted order so output is stable.
+        positions: Dict[str, list] = {ch: [] for ch in known_chars}
+        for ch, xx in zip(glyph_str, x_offsets):
+            positions[ch].append(xx)
+        del positions[" "]
+
+        refs = []
+        for ch in sorted(positions):
+            xs = positions[ch]
+            if not xs:
                 continue
-            gcell = glyph_cells.get(ch)
-            if gcell is None:
-                raise ValueError(f"Missing glyph in font for character: {ch!r}")
-                
-            row_cell.add(gdstk.Reference(gcell, origin=(xx, y_pos)))
-            xx += advance_x
+            x0 = xs[0]
+            ref = gdstk.Reference(glyph_cells[ch], origin=(x0, y_pos))
+            if len(xs) > 1:
+                # Offsets are relative to the origin, which is itself the first copy
+                ref.repetition = gdstk.Repetition(x_offsets=[xx - x0 for xx in xs[1:]])
+            refs.append(ref)
+
+        if refs:
+            row_cell.add(*refs)
         return row_cell
 
     # Process rows one at a time: read line -> build row cell -> reference from top
@@ -361,12 +452,14 @@ def _stream_rows_to_writer(
             line = line[:-1]
 
         # Decide if row has any glyphs (non-space)
-        per_row_digits = sum(1 for ch in line if ch != " ")
+        per_row_digits = len(line) - line.count(" ")
         if per_row_digits > 0:
             cell_name = f"R{starting_row}-{row}"
             cell = row_to_cell(line, y, cell_name)
-            # Reference the row cell from the top cell; origin at (0, 0) since y is baked into row cell
-            top.add(gdstk.Reference(cell))
+            writer.write(cell)
+            # Reference the row cell from the top cell; origin at (0, 0) since y is baked into row cell.
+            # Referencing by name lets the row cell be freed now that it is on disk.
+            top.add(gdstk.Reference(cell_name))
             cell_count += per_row_digits
             digit_count += per_row_digits
 
@@ -388,62 +481,179 @@ def _stream_rows_to_writer(
     # Unreachable
 
 
+def _load_font(args: argparse.Namespace) -> Tuple[gdstk.Library, Dict[str, gdstk.Cell], float, float]:
+    """Build the pixel and glyph cells for the CLI's font into a new library.
+
+    Returns (library, glyph_cells, advance_x, advance_y).
+    """
+    lib = gdstk.Library(unit=args.unit, precision=args.precision)
+    glyph_cells, _, adv_x, adv_y = load_font_build_cells(
+        font_path=args.font,
+        lib=lib,
+        pixel_size=args.pixel_size,
+        layer=args.layer,
+        datatype=args.datatype,
+    )
+    return lib, glyph_cells, adv_x, adv_y
+
+
+def _part_out_path(args: argparse.Namespace, part: int) -> str:
+    """Return the output path for the given 1-based part number."""
+    if args.rows_per_file is None:
+        return args.out
+    base, ext = os.path.splitext(args.out)
+    return f"{base}_part{part:03d}{ext or '.gds'}"
+
+
+def _write_part(
+    fin: Iterable[str],
+    args: argparse.Namespace,
+    part: int,
+    lib: gdstk.Library,
+    glyph_cells: Dict[str, gdstk.Cell],
+    advance_x: float,
+    advance_y: float,
+    starting_row: int,
+) -> Tuple[int, bool]:
+    """Write one GDS part from the lines of fin.
+
+    Returns (rows_processed, eof_reached), as _stream_rows_to_writer does.
+    """
+    out_path = _part_out_path(args, part)
+
+    # Row cells are streamed to this writer as they are built; glyphs go first
+    print(f"Writing GDS part {part}: {out_path}")
+    writer = gdstk.GdsWriter(out_path, unit=args.unit, precision=args.precision)
+    try:
+        writer.write(*lib.cells)
+
+        # Create a top cell that will reference each row cell
+        top = gdstk.Cell("TOP")
+
+        # Stream rows into row cells and add references to top
+        rows_done, eof = _stream_rows_to_writer(
+            fin=fin,
+            writer=writer,
+            top=top,
+            glyph_cells=glyph_cells,
+            advance_x=advance_x,
+            advance_y=advance_y,
+            rows_limit=args.rows_per_file,
+            progress_every=args.progress_every,
+            starting_row=starting_row,
+        )
+
+        writer.write(top)
+    except BaseException:
+        # Don't leave a truncated GDS file (no ENDLIB) behind
+        writer.close()
+        os.remove(out_path)
+        raise
+    writer.close()
+    print(f"Wrote GDS part {part}: {out_path}")
+
+    return rows_done, eof
+
+
+# A line break as the newline=None text reader sees it: CRLF, LF, or a bare CR
+_LINE_BREAK_RE = re.compile(rb"\r\n|\r|\n")
+
+# Bytes _find_part_offsets reads from the text file at a time
+_OFFSET_SCAN_BYTES = 1 << 20
+
+def _find_part_offsets(text_path: str, rows_per_file: int) -> list:
+    """Return the byte offset in the text file at which each non-empty part starts.
+
+    Lines are split with the same rules as the text-mode reader used to stream the
+    rows, so each part starts exactly where the serial path would start it.
+    """
+    offsets = [0]
+    pos = 0  # byte offset of the start of buf
+    rows = 0
+    held = b""
+    with open(text_path, "rb") as f:
+        while True:
+            chunk = f.read(_OFFSET_SCAN_BYTES)
+            buf = held + chunk
+            held = b""
+            if chunk and buf.endswith(b"\r"):
+                # This CR may be the first half of a CRLF split across reads
+                buf, held = buf[:-1], b"\r"
+            for m in _LINE_BREAK_RE.finditer(buf):
+                rows += 1
+                if rows == rows_per_file:
+                    offsets.append(pos + m.end())
+                    rows = 0
+            pos += len(buf)
+            if not chunk:
+                break
+    # Never start a part at EOF (this also covers an empty file)
+    if offsets[-1] == pos:
+        offsets.pop()
+    return offsets
+
+
+def _write_part_from_offset(args: argparse.Namespace, part: int, start_offset: int) -> int:
+    """Pool worker: write the given part, reading the text from start_offset.
+
+    gdstk cells cannot be sent between processes, so each worker builds its own
+    copy of the font. Returns the number of rows processed.
+    """
+    lib, glyph_cells, adv_x, adv_y = _load_font(args)
+    with open(args.text, "rb") as raw:
+        raw.seek(start_offset)
+        with io.TextIOWrapper(raw, encoding="utf-8", newline=None) as fin:
+            rows_done, _ = _write_part(
+                fin, args, part, lib, glyph_cells, adv_x, adv_y,
+                starting_row=(part - 1) * args.rows_per_file,
+            )
+    return rows_done
+
+
 def main() -> None:
     args = parse_args()
 
     part = 0
     total_rows = 0
 
-    with open(args.text, "r", encoding="utf-8", newline=None) as fin:
-        eof = False
-        while not eof:
-            part += 1
-
-            # New library for this part
-            lib = gdstk.Library(unit=args.unit, precision=args.precision)
-            # Build glyphs inside this library so row cells can reference them
-            glyph_cells, (w_px, h_px), adv_x, adv_y = load_font_build_cells(
-                font_path=args.font,
-                lib=lib,
-                pixel_size=args.pixel_size,
-                layer=args.layer,
-                datatype=args.datatype,
+    if args.rows_per_file is not None and args.jobs > 1:
+        # Parts are independent once we know where each one starts in the text,
+        # so find those offsets in one quick scan and write the parts in parallel
+        offsets = _find_part_offsets(args.text, args.rows_per_file)
+        part = len(offsets)
+        with multiprocessing.Pool(min(args.jobs, part or 1)) as pool:
+            total_rows = sum(
+                pool.starmap(
+                    _write_part_from_offset,
+                    [(args, i + 1, offset) for i, offset in enumerate(offsets)],
+                )
             )
+        print(f"Done. Total rows processed: {total_rows:,}. Parts written: {part}.")
+        return
 
-            # Create a top cell that will reference each row cell
-            top = lib.new_cell("TOP")
-
-            # Stream rows into row cells and add references to top
-            rows_done, eof = _stream_rows_to_writer(
-                fin=fin,
-                lib=lib,
-                top=top,
-                glyph_cells=glyph_cells,
-                advance_x=adv_x,
-                advance_y=adv_y,
-                rows_limit=args.rows_per_file,
-                progress_every=args.progress_every,
-                starting_row=total_rows,
-            )
+    # The glyph cells are the same in every part, so build them once; each part's
+    # writer gets its own copy of them on disk and its row cells reference them by name
+    lib, glyph_cells, adv_x, adv_y = _load_font(args)
 
-            # If no rows were processed and EOF, do not write an empty file
-            if rows_done == 0 and eof:
+    with open(args.text, "r", encoding="utf-8", newline=None) as fin:
+        lines = iter(fin)
+        while True:
+            # Peek at the next line so we never open an output file for an empty part
+            first_line = next(lines, None)
+            if first_line is None:
                 break
 
-            # Decide output path
-            if args.rows_per_file is None:
-                out_path = args.out
-            else:
-                base, ext = os.path.splitext(args.out)
-                out_path = f"{base}_part{part:03d}{ext or '.gds'}"
+            part += 1
 
-            print(f"Writing GDS part {part}: {out_path}")
-            lib.write_gds(out_path)
-            print(f"Wrote GDS part {part}: {out_path}")
+            rows_done, eof = _write_part(
+                itertools.chain((first_line,), lines),
+                args, part, lib, glyph_cells, adv_x, adv_y,
+                starting_row=total_rows,
+            )
 
             total_rows += rows_done
             # If not chunking, we only intended one part
-            if args.rows_per_file is None:
+            if eof or args.rows_per_file is None:
                 break
 
     print(f"Done. Total rows processed: {total_rows:,}. Parts written: {part}.")
@@ -9,6 +9,8 @@ Converts a text file to an image where each character becomes a pixel.
 - Optimized for large files (1B+ characters)
 """
 
+import mmap
+import os
 import sys
 from PIL import Image
 import numpy as np
@@ -30,48 +32,50 @@ DIGIT_COLORS: Dict[str, Tuple[int, int, int]] = {
 
 BLACK = (0, 0, 0)  # For whitespace and unknown characters
 
-def char_to_color(char: str) -> Tuple[int, int, int]:
-    """Convert a character to its corresponding RGB color."""
-    if char in DIGIT_COLORS:
-        return DIGIT_COLORS[char]
-    else:
-        return BLACK  # Whitespace and other characters
+# Image palette: index 0 is BLACK, followed by the digit colors in order
+PALETTE = [BLACK] + list(DIGIT_COLORS.values())
+
+def build_palette_lut() -> np.ndarray:
+    """Build a 256-entry lookup table mapping a byte value to its PALETTE index."""
+    lut = np.zeros(256, dtype=np.uint8)  # BLACK for everything else
+    for index, char in enumerate(DIGIT_COLORS, start=1):
+        lut[ord(char)] = index
+    return lut
 
-def process_text_to_image(input_file: str, output_file: str, chunk_size: int = 1024*1024):
+def process_text_to_image(input_file: str, output_file: str):
     """
     Convert text file to image with memory-efficient processing.
     
+    The file is memory-mapped and scanned once: newline positions give the
+    image dimensions, and each line's bytes are then colored straight from the map.
+    
     Args:
         input_file: Path to input text file
         output_file: Path to output image file
-        chunk_size: Size of chunks to read at once (default 1MB)
     """
     print(f"Processing {input_file} -> {output_file}")
     
-    # First pass: determine image dimensions
-    print("First pass: analyzing file structure...")
-    max_width = 0
-    height = 0
-    current_width = 0
+    with open(input_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            print("Error: Invalid file structure")
+            return
+        # The map stays valid after the file is closed and is released along with buf
+        buf = np.frombuffer(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), dtype=np.uint8)
     
-    with open(input_file, 'r', encoding='utf-8') as f:
-        while True:
-            chunk = f.read(chunk_size)
-            if not chunk:
-                break
-                
-            for char in chunk:
-                if char == '\n':
-                    max_width = max(max_width, current_width)
-                    current_width = 0
-                    height += 1
-                else:
-                    current_width += 1
+    # Find every line from the newline positions
+    print("Analyzing file structure...")
+    newlines = np.flatnonzero(buf == ord('\n'))
+    starts = np.concatenate(([0], newlines + 1))
+    ends = np.concatenate((newlines, [buf.size]))
+    if starts[-1] == buf.size:
+        # File ends with a newline, so there is no partial last line
+        starts, ends = starts[:-1], ends[:-1]
+    # Drop the CR of CRLF line endings
+    ends -= (ends > starts) & (buf[np.maximum(ends - 1, 0)] == ord('\r'))
     
-    # Handle case where file doesn't end with newline
-    if current_width > 0:
-        max_width = max(max_width, current_width)
-        height += 1
+    height = len(starts)
+    widths = ends - starts
+    max_width = int(widths.max())
     
     print(f"Image dimensions: {max_width} x {height}")
     
@@ -79,34 +83,34 @@ def process_text_to_image(input_file: str, output_file: str, chunk_size: int = 1
         print("Error: Invalid file structure")
         return
     
-    # Create image array
-    print("Creating image array...")
-    image_array = np.zeros((height, max_width, 3), dtype=np.uint8)
+    lut = build_palette_lut()
     
-    # Second pass: populate image data
-    print("Second pass: converting text to pixels...")
-    row = 0
-    col = 0
-    
-    with open(input_file, 'r', encoding='utf-8') as f:
-        while True:
-            chunk = f.read(chunk_size)
-            if not chunk:
-                break
-                
-            for char in chunk:
-                if char == '\n':
-                    row += 1
-                    col = 0
-                else:
-                    if row < height and col < max_width:
-                        color = char_to_color(char)
-                        image_array[row, col] = color
-                    col += 1
+    # Distance between the starts of consecutive lines, if they are evenly spaced
+    line_stride = int(starts[1] - starts[0]) if height > 1 else 0
+    if (widths == max_width).all() and (starts == np.arange(height) * line_stride).all():
+        # Rectangular text (e.g. a fixed-width digit grid): view the lines as one
+        # 2D grid that skips the line endings and map it with a single gather
+        print("Converting text to pixels...")
+        grid = np.lib.stride_tricks.as_strided(
+            buf, shape=(height, max_width), strides=(line_stride, 1), writeable=False
+        )
+        image_array = lut[grid]
+    else:
+        # Create image array
+        print("Creating image array...")
+        image_array = np.zeros((height, max_width), dtype=np.uint8)
+        
+        # Populate image data; each line is mapped to palette indices with one
+        # lookup-table gather over its bytes
+        print("Converting text to pixels...")
+        for row, (line_start, line_end) in enumerate(zip(starts.tolist(), ends.tolist())):
+            image_array[row, :line_end - line_start] = lut[buf[line_start:line_end]]
     
     # Create and save image
     print("Creating and saving image...")
+    # A palettized image stores one byte per pixel instead of three
     image = Image.fromarray(image_array)
+    image.putpalette([channel for color in PALETTE for channel in color])
     image.save(output_file, 'PNG', optimize=True)
     
     print(f"Image saved as {output_file}")